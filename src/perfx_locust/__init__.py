@@ -8,24 +8,8 @@ PerfX Locust - 性能测试平台 Locust 集成工具
 - InfluxDB 数据上报
 """
 
-from gevent import monkey
-
-# 在包导入最早阶段进行 gevent monkey-patch，避免在其他模块已导入后才 patch
-monkey.patch_all()
-
 __version__ = "0.1.0"
 
-from .client import PerfXClient
-from .influxdb_reporter import InfluxDBReporter
-from .models import (
-    ArgumentParameter,
-    TestRunDetail,
-    ValidationError,
-    ValidationResult,
-)
-from .runner import PerfXRunner
-from .validator import ArgumentValidator
-
 __all__ = [
     "PerfXClient",
     "PerfXRunner",
@@ -35,4 +19,28 @@ __all__ = [
     "ArgumentParameter",
     "ValidationResult",
     "ValidationError",
-]
\ No newline at end of file
+]
+
+# PEP 562 延迟导入：httpx/influxdb_client/locust 等重依赖只在首次访问对应
+# 名称时加载，降低 `perfx --help` 等轻量调用的启动成本
+_LAZY_IMPORTS = {
+    "PerfXClient": ".client",
+    "PerfXRunner": ".runner",
+    "InfluxDBReporter": ".influxdb_reporter",
+    "ArgumentValidator": ".validator",
+    "TestRunDetail": ".models",
+    "ArgumentParameter": ".models",
+    "ValidationResult": ".models",
+    "ValidationError": ".models",
+}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    attr = getattr(import_module(module_name, __name__), name)
+    globals()[name] = attr
+    return attr
@@ -3,21 +3,12 @@ PerfX CLI - Command Line Interface
 
 提供 `perfx` 命令，用于执行 Locust 性能测试。
 """
-# 必须在最开始执行 gevent monkey-patch，避免与其他库冲突
-from gevent import monkey
-monkey.patch_all()
-
 import logging
 import sys
 from typing import Any, Dict, Optional
 
 import click
 
-from .client import PerfXClient
-from .influxdb_reporter import InfluxDBReporter
-from .runner import PerfXRunner
-from .validator import ArgumentValidator
-
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -40,24 +31,31 @@ def parse_extra_args(args: tuple) -> Dict[str, Any]:
         参数字典
     """
     result = {}
-    i = 0
-    while i < len(args):
-        arg = args[i]
-        if arg.startswith("--"):
-            if "=" in arg:
-                # --key=value 格式
-                key, value = arg[2:].split("=", 1)
-                result[key.replace("-", "_")] = value
-            elif i + 1 < len(args) and not args[i + 1].startswith("--"):
+    pending_key = None
+    for arg in args:
+        is_option = arg[:2] == "--"
+
+        if pending_key is not None:
+            if not is_option:
                 # --key value 格式
-                key = arg[2:].replace("-", "_")
-                result[key] = args[i + 1]
-                i += 1
+                result[pending_key] = arg
+                pending_key = None
+                continue
+            # 上一个选项没有值，是 --flag 格式 (布尔值)
+            result[pending_key] = True
+            pending_key = None
+
+        if is_option:
+            key, sep, value = arg[2:].partition("=")
+            key = key.replace("-", "_")
+            if sep:
+                # --key=value 格式
+                result[key] = value
             else:
-                # --flag 格式 (布尔值)
-                key = arg[2:].replace("-", "_")
-                result[key] = True
-        i += 1
+                pending_key = key
+
+    if pending_key is not None:
+        result[pending_key] = True
     return result
 
 
@@ -142,12 +140,20 @@ def main(
     if verbose:
         logging.getLogger().setLevel(logging.DEBUG)
 
+    # 仅在真正执行测试时 monkey-patch（--help/--dry-run 不付出 patch_all 成本），
+    # 且必须在 httpx/locust 建立连接之前完成
+    if not dry_run:
+        from gevent import monkey
+        monkey.patch_all()
+
     # 解析额外参数
     extra_args = parse_extra_args(ctx.args)
     if extra_args:
         logger.info("[CLI] 额外参数: %s", extra_args)
 
-    # 创建平台客户端
+    # 创建平台客户端（延迟导入，`perfx --help` 不加载 httpx/pydantic 等重依赖）
+    from .client import PerfXClient
+
     client = PerfXClient(base_url=platform_url)
 
     try:
@@ -164,6 +170,8 @@ def main(
         logger.info("  - 运行时间: %s", test_run.run_time or "无限制")
 
         # 2. 验证参数
+        from .validator import ArgumentValidator
+
         validator = ArgumentValidator(test_run)
         validation_result = validator.validate(extra_args)
 
@@ -208,6 +216,8 @@ def main(
         # 4. 创建 InfluxDB 上报器
         influx_reporter = None
         if influxdb_url:
+            from .influxdb_reporter import InfluxDBReporter
+
             # 将命令行参数转换为字符串标签，用于 InfluxDB 筛选
             arg_tags = {k: str(v) for k, v in resolved_args.items()}
             influx_reporter = InfluxDBReporter(
@@ -229,6 +239,8 @@ def main(
                 influx_reporter = None
 
         # 5. 创建运行器
+        from .runner import PerfXRunner
+
         runner = PerfXRunner(
             locustfile=locustfile,
             host=host,
@@ -261,26 +273,25 @@ def main(
                 influx_reporter.write_test_event("fail", error)
                 influx_reporter.close()
 
-        def on_request(data: dict):
-            if influx_reporter:
-                influx_reporter.write_request(
-                    request_type=data["request_type"],
-                    name=data["name"],
-                    response_time=data["response_time"],
-                    response_length=data["response_length"],
-                    success=data["success"],
-                    exception=data.get("exception"),
-                )
+        def on_request(
+                request_type, name, response_time, response_length,
+                success, exception=None,
+        ):
+            influx_reporter.write_request(
+                request_type, name, response_time, response_length,
+                success, exception,
+            )
 
         def on_stats(data: dict):
-            if influx_reporter:
-                influx_reporter.write_stats(**data)
+            influx_reporter.write_stats(**data)
 
         runner.on_start(on_start)
         runner.on_complete(on_complete)
         runner.on_fail(on_fail)
-        runner.on_request(on_request)
-        runner.on_stats(on_stats)
+        # 仅在启用 InfluxDB 时注册热路径回调，避免每个请求事件的无效调用
+        if influx_reporter:
+            runner.on_request(on_request)
+            runner.on_stats(on_stats)
 
         # 7. 执行测试
         logger.info("[CLI] 开始执行测试...")
@@ -5,6 +5,7 @@ import logging
 from typing import Any, Dict, Optional
 
 import httpx
+import orjson
 
 from .models import TestRunDetail
 
@@ -47,15 +48,31 @@ class PerfXClient:
         """
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
-        self._client = httpx.Client(
-            base_url=self.base_url,
-            timeout=timeout,
-            headers={"Content-Type": "application/json"},
-        )
+        self._http: Optional[httpx.Client] = None
+
+    @property
+    def _client(self) -> httpx.Client:
+        """延迟构建 httpx.Client（首次请求时才初始化 TLS 上下文和连接池）"""
+        if self._http is None:
+            # HTTP/2 + keep-alive 连接池：状态同步调用复用连接，避免每次握手
+            self._http = httpx.Client(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                http2=True,
+                limits=httpx.Limits(
+                    max_keepalive_connections=8,
+                    max_connections=16,
+                    keepalive_expiry=300.0,
+                ),
+                headers={"Content-Type": "application/json"},
+            )
+        return self._http
 
     def close(self):
         """关闭客户端"""
-        self._client.close()
+        if self._http is not None:
+            self._http.close()
+            self._http = None
 
     def __enter__(self):
         return self
@@ -65,9 +82,9 @@ class PerfXClient:
 
     def _handle_response(self, response: httpx.Response) -> Dict[str, Any]:
         """处理响应"""
-        # 先尝试解析 JSON，处理空响应的情况
+        # 只解码一次 JSON（orjson），处理空响应的情况
         try:
-            data = response.json() if response.text.strip() else {}
+            data = orjson.loads(response.content) if response.content else {}
         except Exception:
             data = {}
 
@@ -94,10 +111,11 @@ class PerfXClient:
         Returns:
             TestRunDetail 对象
         """
-        logger.debug("[PerfXClient] 获取测试运行详情: %s", run_id)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[PerfXClient] 获取测试运行详情: %s", run_id)
         response = self._client.get(f"/api/evaluation/perf/runs/{run_id}")
         data = self._handle_response(response)
-        return TestRunDetail(**data)
+        return TestRunDetail.from_api(data)
 
     def start_test_run(
         self,
@@ -121,7 +139,7 @@ class PerfXClient:
         
         response = self._client.post(
             f"/api/evaluation/perf/runs/{run_id}/start",
-            json=payload if payload else None,
+            content=orjson.dumps(payload) if payload else None,
         )
         return self._handle_response(response)
 
@@ -147,7 +165,7 @@ class PerfXClient:
         
         response = self._client.post(
             f"/api/evaluation/perf/runs/{run_id}/complete",
-            json=payload if payload else None,
+            content=orjson.dumps(payload) if payload else None,
         )
         return self._handle_response(response)
 
@@ -169,7 +187,7 @@ class PerfXClient:
         logger.warning("[PerfXClient] 标记测试运行失败: %s, error: %s", run_id, error_message)
         response = self._client.post(
             f"/api/evaluation/perf/runs/{run_id}/fail",
-            json={"error_message": error_message},
+            content=orjson.dumps({"error_message": error_message}),
         )
         return self._handle_response(response)
 
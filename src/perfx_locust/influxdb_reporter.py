@@ -4,16 +4,38 @@ InfluxDB Reporter for perfx-locust
 实时上报 Locust 性能数据到 InfluxDB。
 """
 import logging
+import re
 import time
-from datetime import datetime
-from typing import Any, Dict, Optional
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
 
-from influxdb_client import InfluxDBClient, Point, WritePrecision
-from influxdb_client.client.write_api import SYNCHRONOUS
+from influxdb_client import InfluxDBClient, WritePrecision
+from influxdb_client.client.write_api import WriteOptions
 
 logger = logging.getLogger(__name__)
 
 
+# line protocol 标签值中需要转义的字符（逗号/等号/空格/反斜杠），模块级编译一次
+_ESCAPE_RE = re.compile(r"([,= \\])")
+
+# success 标签值按布尔下标取常量，避免每次 str(success).lower() 分配新字符串
+_BOOL_STR = ("false", "true")
+
+
+@lru_cache(maxsize=1024)
+def _escape_tag(value: str) -> str:
+    """转义 line protocol 标签值中的特殊字符
+
+    标签值集合很小（每个被测接口一个），缓存转义结果避免重复扫描。
+    """
+    return _ESCAPE_RE.sub(r"\\\1", str(value))
+
+
+def _escape_field_str(value: str) -> str:
+    """转义 line protocol 字符串字段值（双引号/反斜杠）"""
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
 class InfluxDBReporter:
     """
     InfluxDB 数据上报器
@@ -21,6 +43,27 @@ class InfluxDBReporter:
     监听 Locust 事件，实时将性能数据写入 InfluxDB。
     """
 
+    __slots__ = (
+        "url",
+        "token",
+        "org",
+        "bucket",
+        "run_id",
+        "endpoint_id",
+        "endpoint_path",
+        "env_code",
+        "gpu_model",
+        "extra_tags",
+        "_base_tag_items",
+        "_tag_suffix",
+        "_req_prefix_cache",
+        "_stats_prefix",
+        "_event_prefix",
+        "_client",
+        "_write_api",
+        "_enabled",
+    )
+
     def __init__(
         self,
         url: str,
@@ -59,7 +102,20 @@ class InfluxDBReporter:
         self.env_code = env_code
         self.gpu_model = gpu_model
         self.extra_tags = extra_tags or {}
-        
+
+        # 基础标签在运行期间不变，构建一次为不可变元组，避免每次写入重建 dict
+        self._base_tag_items = tuple(self._build_base_tags().items())
+        # 预转义的基础标签后缀，写入时直接拼接 line protocol 字符串
+        self._tag_suffix = ",".join(
+            f"{_escape_tag(k)}={_escape_tag(v)}" for k, v in self._base_tag_items
+        )
+        # 按 (request_type, name, success) 缓存完整标签前缀，基数 ≤ 接口数 × 2
+        self._req_prefix_cache: Dict[Tuple[str, str, bool], str] = {}
+
+        # 统计/事件数据的 line protocol 前缀，基础标签只格式化一次
+        self._stats_prefix = f"locust_stats,{self._tag_suffix}"
+        self._event_prefix = f"locust_event,{self._tag_suffix}"
+
         self._client: Optional[InfluxDBClient] = None
         self._write_api = None
         self._enabled = False
@@ -83,7 +139,21 @@ class InfluxDBReporter:
             )
             # 测试连接
             self._client.ping()
-            self._write_api = self._client.write_api(write_options=SYNCHRONOUS)
+            # 异步批量写入：数据点先进入客户端队列，按批次定期 POST，
+            # 避免高 QPS 下每个请求事件都阻塞一次 HTTP 往返
+            self._write_api = self._client.write_api(
+                write_options=WriteOptions(
+                    batch_size=5000,
+                    flush_interval=1_000,
+                    jitter_interval=200,
+                    retry_interval=5_000,
+                    max_retries=3,
+                    max_retry_delay=30_000,
+                    exponential_base=2,
+                ),
+                error_callback=self._on_write_error,
+                retry_callback=self._on_write_retry,
+            )
             self._enabled = True
             logger.info("[InfluxDB] 连接成功: %s", self.url)
             return True
@@ -92,8 +162,22 @@ class InfluxDBReporter:
             self._enabled = False
             return False
 
+    def _on_write_error(self, conf, data, exception):
+        """异步批量写入失败回调（重试耗尽后调用）"""
+        logger.warning("[InfluxDB] 批量写入失败: %s", exception)
+
+    def _on_write_retry(self, conf, data, exception):
+        """异步批量写入重试回调"""
+        logger.info("[InfluxDB] 批量写入重试: %s", exception)
+
     def close(self):
-        """关闭连接"""
+        """关闭连接（先排空写入队列）"""
+        if self._write_api:
+            try:
+                self._write_api.flush()
+                self._write_api.close()
+            except Exception as e:
+                logger.warning("[InfluxDB] 排空写入队列失败: %s", e)
         if self._client:
             self._client.close()
             self._client = None
@@ -145,34 +229,33 @@ class InfluxDBReporter:
         if not self._enabled:
             return
 
-        try:
-            tags = self._build_base_tags()
-            tags["request_type"] = request_type
-            tags["name"] = name
-            tags["success"] = str(success).lower()
-
-            point = (
-                Point("locust_request")
-                .time(datetime.utcnow(), WritePrecision.MS)
-            )
-            
-            for tag_key, tag_value in tags.items():
-                point = point.tag(tag_key, tag_value)
-            
-            point = (
-                point
-                .field("response_time", response_time)
-                .field("response_length", response_length)
-                .field("success_count", 1 if success else 0)
-                .field("failure_count", 0 if success else 1)
+        # 直接拼 line protocol 字符串，跳过 Point 构建器的 dict 维护和逐标签转义；
+        # 写入错误由异步 WriteApi 的 error_callback 统一处理
+        fields = (
+            f"response_time={response_time},"
+            f"response_length={response_length}i,"
+            f"success_count={1 if success else 0}i,"
+            f"failure_count={0 if success else 1}i"
+        )
+        if exception:
+            fields += f',exception="{_escape_field_str(exception[:500])}"'
+
+        cache_key = (request_type, name, success)
+        prefix = self._req_prefix_cache.get(cache_key)
+        if prefix is None:
+            prefix = (
+                f"locust_request,{self._tag_suffix}"
+                f",request_type={_escape_tag(request_type)}"
+                f",name={_escape_tag(name)}"
+                f",success={_BOOL_STR[bool(success)]}"
             )
-            
-            if exception:
-                point = point.field("exception", exception[:500])
+            self._req_prefix_cache[cache_key] = prefix
 
-            self._write_api.write(bucket=self.bucket, record=point)
-        except Exception as e:
-            logger.warning("[InfluxDB] 写入请求数据失败: %s", e)
+        self._write_api.write(
+            bucket=self.bucket,
+            record=f"{prefix} {fields} {time.time_ns()}",
+            write_precision=WritePrecision.NS,
+        )
 
     def write_stats(
         self,
@@ -203,33 +286,24 @@ class InfluxDBReporter:
         if not self._enabled:
             return
 
-        try:
-            tags = self._build_base_tags()
+        # 9 个字段一次性格式化为单条 line protocol，替代逐字段的 .field() 调用
+        line = (
+            f"{self._stats_prefix} "
+            f"user_count={user_count}i,"
+            f"rps={float(rps)},"
+            f"fail_ratio={float(fail_ratio)},"
+            f"avg_response_time={float(avg_response_time)},"
+            f"min_response_time={float(min_response_time)},"
+            f"max_response_time={float(max_response_time)},"
+            f"median_response_time={float(median_response_time)},"
+            f"p95_response_time={float(p95_response_time)},"
+            f"p99_response_time={float(p99_response_time)}"
+            f" {time.time_ns()}"
+        )
 
-            point = (
-                Point("locust_stats")
-                .time(datetime.utcnow(), WritePrecision.MS)
-            )
-            
-            for tag_key, tag_value in tags.items():
-                point = point.tag(tag_key, tag_value)
-            
-            point = (
-                point
-                .field("user_count", user_count)
-                .field("rps", float(rps))
-                .field("fail_ratio", float(fail_ratio))
-                .field("avg_response_time", float(avg_response_time))
-                .field("min_response_time", float(min_response_time))
-                .field("max_response_time", float(max_response_time))
-                .field("median_response_time", float(median_response_time))
-                .field("p95_response_time", float(p95_response_time))
-                .field("p99_response_time", float(p99_response_time))
-            )
-
-            self._write_api.write(bucket=self.bucket, record=point)
-        except Exception as e:
-            logger.warning("[InfluxDB] 写入统计数据失败: %s", e)
+        self._write_api.write(
+            bucket=self.bucket, record=line, write_precision=WritePrecision.NS
+        )
 
     def write_test_event(self, event_type: str, message: Optional[str] = None):
         """
@@ -242,22 +316,16 @@ class InfluxDBReporter:
         if not self._enabled:
             return
 
-        try:
-            tags = self._build_base_tags()
-            tags["event_type"] = event_type
+        # 事件与请求/统计数据进入同一批量队列，错误由 _on_write_error 统一处理
+        fields = "value=1i"
+        if message:
+            fields += f',message="{_escape_field_str(message[:500])}"'
 
-            point = (
-                Point("locust_event")
-                .time(datetime.utcnow(), WritePrecision.MS)
-            )
-            
-            for tag_key, tag_value in tags.items():
-                point = point.tag(tag_key, tag_value)
-            
-            point = point.field("value", 1)
-            if message:
-                point = point.field("message", message[:500])
-
-            self._write_api.write(bucket=self.bucket, record=point)
-        except Exception as e:
-            logger.warning("[InfluxDB] 写入事件数据失败: %s", e)
+        line = (
+            f"{self._event_prefix},event_type={_escape_tag(event_type)}"
+            f" {fields} {time.time_ns()}"
+        )
+
+        self._write_api.write(
+            bucket=self.bucket, record=line, write_precision=WritePrecision.NS
+        )
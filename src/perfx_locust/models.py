@@ -4,7 +4,7 @@ Data models for perfx-locust
 from datetime import datetime
 from typing import Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class ArgumentParameter(BaseModel):
@@ -41,7 +41,8 @@ class EndpointInfo(BaseModel):
             return []
         
         params_data = self.argument_schema.get("parameters", [])
-        return [ArgumentParameter(**p) for p in params_data]
+        # 参数定义来自平台已校验的 JSON，跳过 pydantic 验证
+        return [ArgumentParameter.model_construct(**p) for p in params_data]
 
 
 class EnvironmentInfo(BaseModel):
@@ -80,6 +81,26 @@ class TestRunDetail(BaseModel):
     arguments: Optional[Dict[str, str]] = None
     created_at: Optional[datetime] = None
 
+    # 参数架构在运行期间不变，首次计算后缓存
+    _cached_params: Optional[List[ArgumentParameter]] = PrivateAttr(default=None)
+    _cached_required: Optional[List[ArgumentParameter]] = PrivateAttr(default=None)
+
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> "TestRunDetail":
+        """从平台返回的 JSON 构建实例
+
+        平台侧数据已经过校验，使用 model_construct 跳过 pydantic 的
+        类型转换和验证器，仅手动构建嵌套模型。
+        """
+        data = dict(data)
+        endpoint = data.get("endpoint")
+        if isinstance(endpoint, dict):
+            data["endpoint"] = EndpointInfo.model_construct(**endpoint)
+        environment = data.get("environment")
+        if isinstance(environment, dict):
+            data["environment"] = EnvironmentInfo.model_construct(**environment)
+        return cls.model_construct(**data)
+
     def get_host(self) -> Optional[str]:
         """获取测试目标 host"""
         if self.environment and self.environment.host:
@@ -87,14 +108,20 @@ class TestRunDetail(BaseModel):
         return None
 
     def get_argument_parameters(self) -> List[ArgumentParameter]:
-        """获取参数定义列表（从 endpoint 中获取）"""
-        if self.endpoint:
-            return self.endpoint.get_parameters()
-        return []
+        """获取参数定义列表（从 endpoint 中获取，结果缓存）"""
+        if self._cached_params is None:
+            self._cached_params = (
+                self.endpoint.get_parameters() if self.endpoint else []
+            )
+        return self._cached_params
 
     def get_required_parameters(self) -> List[ArgumentParameter]:
-        """获取必填参数列表"""
-        return [p for p in self.get_argument_parameters() if p.required]
+        """获取必填参数列表（结果缓存）"""
+        if self._cached_required is None:
+            self._cached_required = [
+                p for p in self.get_argument_parameters() if p.required
+            ]
+        return self._cached_required
 
     def get_shape_steps(self) -> Optional[List[ShapeStep]]:
         """获取负载曲线步骤"""
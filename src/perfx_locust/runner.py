@@ -4,18 +4,48 @@ PerfX Runner - Locust Execution Engine
 核心运行器，负责加载用户脚本、配置环境、执行测试并同步状态。
 """
 import argparse
+import bisect
 import importlib.util
 import logging
 import os
+import py_compile
 import sys
+from collections import deque
 from pathlib import Path
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 import gevent
+import gevent.event
 
 logger = logging.getLogger(__name__)
 
 
+def _lazy_module(name: str):
+    """返回延迟加载的模块代理（首次属性访问时才真正执行模块）"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# locust 在模块顶层以 LazyLoader 挂载：各方法不再逐次执行 import 语句，
+# 而真正的加载（含 locust 自身的 monkey-patch）推迟到首次使用
+_locust = _lazy_module("locust")
+
+
+def _ensure_monkey_patched():
+    """确保 gevent monkey-patch 已生效（直接使用 PerfXRunner 的库用户兜底）"""
+    from gevent import monkey
+
+    if not monkey.is_module_patched("socket"):
+        monkey.patch_all()
+
+
 class PerfXRunner:
     """
     PerfX 运行器
@@ -27,6 +57,12 @@ class PerfXRunner:
     - InfluxDB 数据上报
     """
 
+    # (脚本路径, mtime_ns) -> (模块, User 类列表)；同进程重复运行时跳过重新 exec
+    _MODULE_CACHE: Dict[Tuple[str, int], tuple] = {}
+
+    # 运行时间后缀 -> 秒数倍率
+    _RUN_TIME_MULTIPLIERS = {"s": 1, "m": 60, "h": 3600}
+
     def __init__(
             self,
             locustfile: str,
@@ -37,6 +73,7 @@ class PerfXRunner:
             run_id: Optional[str] = None,
             extra_args: Optional[Dict[str, str]] = None,
             locust_args: Optional[List[str]] = None,
+            print_stats: bool = True,
     ):
         """
         初始化运行器
@@ -49,6 +86,7 @@ class PerfXRunner:
             run_time: 运行时间 (如 "1m", "30s")
             run_id: 测试运行 ID
             extra_args: 额外参数 (会设置为环境变量)
+            print_stats: 是否定期在控制台打印统计表格
         """
         self.locustfile = Path(locustfile).resolve()
         self.host = host
@@ -58,12 +96,13 @@ class PerfXRunner:
         self.run_id = run_id
         self.extra_args = extra_args or {}
         self.locust_args = locust_args or []
+        self.print_stats = print_stats
 
         # 回调函数
         self._on_start: Optional[Callable[[], None]] = None
         self._on_complete: Optional[Callable[[], None]] = None
         self._on_fail: Optional[Callable[[str], None]] = None
-        self._on_request: Optional[Callable[[dict], None]] = None
+        self._on_request: Optional[Callable[..., None]] = None
         self._on_stats: Optional[Callable[[dict], None]] = None
 
         self._locust_parsed_options = None
@@ -72,7 +111,18 @@ class PerfXRunner:
         self._environment = None
         self._runner = None
         self._stats_greenlet = None
-        self._stop_flag = False
+        self._printer_greenlet = None
+        # 停止信号：Event.wait(timeout) 让各 greenlet 在停止时立即醒来
+        self._stop_event = gevent.event.Event()
+        # 请求事件缓冲：监听器只追加紧凑元组，独立 greenlet 批量消费
+        self._request_buffer = None
+        self._request_flush_greenlet = None
+        self._request_flush_interval = 0.1
+        # (num_requests, p95, p99) — 请求数未变化时复用上个 tick 的百分位
+        self._percentile_cache = None
+        # HdrHistogram（微秒精度），由请求事件监听器填充；
+        # gevent 协作式调度下监听器与读取方不会抢占，无需加锁
+        self._hdr = None
 
     def on_start(self, callback: Callable[[], None]):
         """注册测试开始回调"""
@@ -89,13 +139,22 @@ class PerfXRunner:
         self._on_fail = callback
         return self
 
-    def on_request(self, callback: Callable[[dict], None]):
-        """注册请求完成回调"""
+    def on_request(self, callback: Callable[..., None]):
+        """注册请求完成回调
+
+        回调按位置参数接收
+        (request_type, name, response_time, response_length, success, exception)，
+        避免在每个请求事件上构建/解包 dict。
+        """
         self._on_request = callback
         return self
 
     def on_stats(self, callback: Callable[[dict], None]):
-        """注册统计数据回调 (定期调用)"""
+        """注册统计数据回调 (定期调用)
+
+        出于性能考虑，回调收到的 dict 在各 tick 间复用；
+        若需要保留快照，回调方需自行 `dict(payload)` 拷贝。
+        """
         self._on_stats = callback
         return self
 
@@ -106,16 +165,31 @@ class PerfXRunner:
         Returns:
             User 类列表
         """
-        from locust import User
+        User = _locust.User
 
         if not self.locustfile.exists():
             raise FileNotFoundError(f"找不到 Locust 脚本: {self.locustfile}")
 
+        # 脚本未变化时复用已加载的模块，跳过重新 exec
+        cache_key = (str(self.locustfile), self.locustfile.stat().st_mtime_ns)
+        cached = self._MODULE_CACHE.get(cache_key)
+        if cached is not None:
+            module, user_classes = cached
+            sys.modules["locustfile"] = module
+            logger.info("[Runner] 复用已加载的 Locust 脚本: %s", self.locustfile)
+            return user_classes
+
+        importlib.invalidate_caches()
+
         # 将脚本目录添加到 sys.path
         script_dir = str(self.locustfile.parent)
         if script_dir not in sys.path:
             sys.path.insert(0, script_dir)
 
+        # 预热字节码缓存：写入 __pycache__ 后，后续冷启动直接走 .pyc 路径
+        sys.dont_write_bytecode = False
+        py_compile.compile(str(self.locustfile), doraise=False)
+
         # 动态加载模块
         spec = importlib.util.spec_from_file_location(
             "locustfile", str(self.locustfile)
@@ -125,14 +199,15 @@ class PerfXRunner:
         spec.loader.exec_module(module)
 
         # 提取 User 类（排除 abstract 和基础 HttpUser）
-        from locust import HttpUser
+        # 直接遍历模块 __dict__，避免 dir() 的排序和逐名 getattr
+        base_classes = (User, _locust.HttpUser)
         user_classes = []
-        for name in dir(module):
-            obj = getattr(module, name)
+        for name, obj in vars(module).items():
             if (
-                    isinstance(obj, type)
+                    not name.startswith("_")
+                    and isinstance(obj, type)
                     and issubclass(obj, User)
-                    and obj not in (User, HttpUser)
+                    and obj not in base_classes
                     and not getattr(obj, "abstract", False)
             ):
                 user_classes.append(obj)
@@ -140,13 +215,15 @@ class PerfXRunner:
         if not user_classes:
             raise ValueError(f"在 {self.locustfile} 中未找到有效的 User 类")
 
+        self._MODULE_CACHE[cache_key] = (module, user_classes)
+
         logger.info("[Runner] 加载了 %d 个 User 类: %s",
                     len(user_classes), [c.__name__ for c in user_classes])
         return user_classes
 
     def _prepare_locust_arguments(self, user_classes: List[type]):
         """触发脚本自定义命令行参数解析（脚本加载后调用）"""
-        from locust import events
+        events = _locust.events
 
         parser = argparse.ArgumentParser(add_help=False)
         # 脚本已加载，其 init_command_line_parser 监听器已注册，现在 fire
@@ -155,19 +232,34 @@ class PerfXRunner:
         self._locust_parsed_options = parsed_options
 
     def _setup_environment(self):
-        """设置额外参数为环境变量"""
+        """设置额外参数为环境变量（值未变化时跳过 setenv）"""
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        environ = os.environ
         for key, value in self.extra_args.items():
             env_key = f"PERFX_{key.upper()}"
-            os.environ[env_key] = str(value)
-            logger.debug("[Runner] 设置环境变量 %s=%s", env_key, value)
+            str_value = str(value)
+            if environ.get(env_key) != str_value:
+                environ[env_key] = str_value
+                if debug_enabled:
+                    logger.debug("[Runner] 设置环境变量 %s=%s", env_key, str_value)
 
         # 设置 run_id
-        if self.run_id:
-            os.environ["PERFX_RUN_ID"] = self.run_id
+        if self.run_id and environ.get("PERFX_RUN_ID") != self.run_id:
+            environ["PERFX_RUN_ID"] = self.run_id
 
     def _attach_event_listeners(self):
         """附加事件监听器"""
-        from locust import events
+        from hdrh.histogram import HdrHistogram
+
+        events = _locust.events
+
+        # 1µs ~ 60s，3 位有效数字
+        self._hdr = HdrHistogram(1, 60_000_000, 3)
+        hdr = self._hdr
+
+        # 仅在注册了回调时分配缓冲；监听器热路径只做一次元组 append
+        buffer = deque(maxlen=100_000) if self._on_request else None
+        self._request_buffer = buffer
 
         @events.request.add_listener
         def on_request(
@@ -178,42 +270,156 @@ class PerfXRunner:
                 exception: Optional[Exception] = None,
                 **kwargs
         ):
-            if self._on_request:
-                self._on_request({
-                    "request_type": request_type,
-                    "name": name,
-                    "response_time": response_time,
-                    "response_length": response_length,
-                    "success": exception is None,
-                    "exception": str(exception) if exception else None,
-                })
+            if response_time:
+                hdr.record_value(int(response_time * 1000))
+            if buffer is not None:
+                buffer.append(
+                    (request_type, name, response_time, response_length, exception)
+                )
 
         @events.quitting.add_listener
         def on_quitting(environment, **kwargs):
-            self._stop_flag = True
+            self._stop_event.set()
             logger.info("[Runner] Locust 正在退出")
 
+        self._start_request_flusher()
+
+    def _start_request_flusher(self, batch_size: int = 1000):
+        """启动请求事件批量消费 greenlet
+
+        监听器按元组入队，这里每个周期最多取 batch_size 条转发给
+        `_on_request` 回调，减少高 QPS 下的 greenlet 切换次数。
+        """
+        buffer = self._request_buffer
+        cb = self._on_request
+        if buffer is None or cb is None:
+            return
+
+        interval = self._request_flush_interval
+
+        stop_event = self._stop_event
+
+        def flush_requests():
+            popleft = buffer.popleft
+            while not stop_event.wait(interval) or buffer:
+                for _ in range(min(len(buffer), batch_size)):
+                    (request_type, name, response_time,
+                     response_length, exception) = popleft()
+                    cb(
+                        request_type,
+                        name,
+                        response_time,
+                        response_length,
+                        exception is None,
+                        str(exception) if exception else None,
+                    )
+
+        self._request_flush_greenlet = gevent.spawn(flush_requests)
+
+    def _resolve_percentiles(self, total) -> tuple:
+        """单次扫描响应时间直方图计算 p95/p99
+
+        Locust 的 get_response_time_percentile 每次调用都完整遍历直方图；
+        这里一次扫描得到两个百分位，且请求数未变化时直接复用缓存。
+        """
+        num_requests = total.num_requests
+        cached = self._percentile_cache
+        if cached is not None and cached[0] == num_requests:
+            return cached[1], cached[2]
+
+        # 优先读 HdrHistogram：O(桶索引) 的百分位查询，无需遍历 dict 直方图
+        if self._hdr is not None and self._hdr.get_total_count():
+            p95 = self._hdr.get_value_at_percentile(95) / 1000.0
+            p99 = self._hdr.get_value_at_percentile(99) / 1000.0
+            self._percentile_cache = (num_requests, p95, p99)
+            return p95, p99
+
+        response_times = total.response_times
+        if not num_requests or not response_times:
+            p95 = p99 = 0
+        else:
+            items = sorted(response_times.items())
+            cumulative = []
+            running = 0
+            for _, count in items:
+                running += count
+                cumulative.append(running)
+            last = len(items) - 1
+            p95 = items[min(bisect.bisect_left(cumulative, num_requests * 0.95), last)][0]
+            p99 = items[min(bisect.bisect_left(cumulative, num_requests * 0.99), last)][0]
+
+        self._percentile_cache = (num_requests, p95, p99)
+        return p95, p99
+
+    # 自适应上报间隔的上下限（秒）：高 RPS 时加密采样，空闲时放缓
+    _STATS_INTERVAL_MIN = 0.5
+    _STATS_INTERVAL_MAX = 5.0
+
     def _start_stats_reporter(self, interval: float = 2.0):
-        """启动统计数据上报"""
+        """启动统计数据上报（间隔随请求速率自适应调整）"""
+        # 回调绑定为闭包局部变量，循环内不再做 self 属性查找；
+        # 未注册回调时完全不启动 greenlet
+        cb = self._on_stats
+        if cb is None:
+            return
+
+        # 复用同一个 payload dict，避免每个 tick 分配 9 键 dict
+        payload = {
+            "user_count": 0,
+            "rps": 0.0,
+            "fail_ratio": 0.0,
+            "avg_response_time": 0.0,
+            "min_response_time": 0.0,
+            "max_response_time": 0.0,
+            "median_response_time": 0.0,
+            "p95_response_time": 0.0,
+            "p99_response_time": 0.0,
+        }
+
+        stop_event = self._stop_event
+        interval_min = self._STATS_INTERVAL_MIN
+        interval_max = self._STATS_INTERVAL_MAX
 
         def report_stats():
-            while not self._stop_flag:
-                gevent.sleep(interval)
-                if self._runner and self._on_stats:
-                    stats = self._runner.stats
-                    total = stats.total
-
-                    self._on_stats({
-                        "user_count": self._runner.user_count,
-                        "rps": total.current_rps,
-                        "fail_ratio": total.fail_ratio,
-                        "avg_response_time": total.avg_response_time,
-                        "min_response_time": total.min_response_time or 0,
-                        "max_response_time": total.max_response_time or 0,
-                        "median_response_time": total.median_response_time or 0,
-                        "p95_response_time": total.get_response_time_percentile(0.95) or 0,
-                        "p99_response_time": total.get_response_time_percentile(0.99) or 0,
-                    })
+            current_interval = interval
+            # 首个 tick 作为预热基线，只记请求数不调整间隔
+            last_num_requests = None
+            while not stop_event.wait(current_interval):
+                runner = self._runner
+                if runner:
+                    # 无用户在跑时跳过统计计算
+                    user_count = runner.user_count
+                    if not user_count:
+                        continue
+                    total = runner.stats.total
+
+                    # 按两个 tick 之间的请求增量调整间隔：
+                    # 高吞吐时收紧采样，低吞吐时放缓，减少无意义的回调
+                    num_requests = total.num_requests
+                    if last_num_requests is not None:
+                        delta = num_requests - last_num_requests
+                        if delta > 1000:
+                            current_interval = max(
+                                interval_min, current_interval / 2
+                            )
+                        elif delta < 10:
+                            current_interval = min(
+                                interval_max, current_interval * 1.5
+                            )
+                    last_num_requests = num_requests
+
+                    p95, p99 = self._resolve_percentiles(total)
+
+                    payload["user_count"] = user_count
+                    payload["rps"] = total.current_rps
+                    payload["fail_ratio"] = total.fail_ratio
+                    payload["avg_response_time"] = total.avg_response_time
+                    payload["min_response_time"] = total.min_response_time or 0
+                    payload["max_response_time"] = total.max_response_time or 0
+                    payload["median_response_time"] = total.median_response_time or 0
+                    payload["p95_response_time"] = p95
+                    payload["p99_response_time"] = p99
+                    cb(payload)
 
         self._stats_greenlet = gevent.spawn(report_stats)
 
@@ -223,18 +429,14 @@ class PerfXRunner:
             return None
 
         time_str = self.run_time.strip().lower()
-        if time_str.endswith("s"):
-            return int(time_str[:-1])
-        elif time_str.endswith("m"):
-            return int(time_str[:-1]) * 60
-        elif time_str.endswith("h"):
-            return int(time_str[:-1]) * 3600
-        else:
-            try:
-                return int(time_str)
-            except ValueError:
-                logger.warning("[Runner] 无法解析运行时间: %s", self.run_time)
-                return None
+        multiplier = self._RUN_TIME_MULTIPLIERS.get(time_str[-1:])
+        try:
+            if multiplier is not None:
+                return int(time_str[:-1]) * multiplier
+            return int(time_str)
+        except ValueError:
+            logger.warning("[Runner] 无法解析运行时间: %s", self.run_time)
+            return None
 
     def run(self) -> bool:
         """
@@ -243,11 +445,14 @@ class PerfXRunner:
         Returns:
             测试是否成功完成
         """
+        _ensure_monkey_patched()
+
         from locust.env import Environment
         from locust.log import setup_logging
         from locust.stats import stats_printer
 
         setup_logging("INFO")
+        self._stop_event.clear()
 
         try:
             # 1. 设置环境变量
@@ -269,7 +474,7 @@ class PerfXRunner:
                 self._environment.parsed_options = self._locust_parsed_options
 
             # 触发 init 事件（脚本使用全局 events 注册监听器）
-            from locust import events as global_events
+            global_events = _locust.events
             global_events.init.fire(
                 environment=self._environment,
                 runner=None,
@@ -289,7 +494,10 @@ class PerfXRunner:
             self._start_stats_reporter()
 
             # 8. 启动 stats printer (可选)
-            gevent.spawn(stats_printer(self._environment.stats))
+            if self.print_stats:
+                self._printer_greenlet = gevent.spawn(
+                    stats_printer(self._environment.stats)
+                )
 
             # 9. 开始生成用户
             logger.info(
@@ -309,10 +517,17 @@ class PerfXRunner:
                 logger.info("[Runner] 测试将持续运行，按 Ctrl+C 停止")
                 self._runner.greenlet.join()
 
-            # 11. 等待 runner 停止
-            self._stop_flag = True
+            # 11. 等待 runner 停止（greenlet 在 Event 置位后自行退出）
+            self._stop_event.set()
+            # stats_printer 自身无限循环，直接 kill，不等待
+            if self._printer_greenlet:
+                self._printer_greenlet.kill(block=False)
+                self._printer_greenlet = None
             if self._stats_greenlet:
-                self._stats_greenlet.kill()
+                self._stats_greenlet.join(timeout=5)
+            # 等待缓冲的请求事件全部转发完（完成回调前确保数据不丢）
+            if self._request_flush_greenlet:
+                self._request_flush_greenlet.join(timeout=5)
 
             # 12. 触发完成回调
             if self._on_complete:
@@ -323,7 +538,7 @@ class PerfXRunner:
 
         except KeyboardInterrupt:
             logger.info("[Runner] 收到中断信号，正在停止测试...")
-            self._stop_flag = True
+            self._stop_event.set()
             if self._runner:
                 self._runner.quit()
             if self._on_complete:
@@ -332,15 +547,20 @@ class PerfXRunner:
 
         except Exception as e:
             logger.error("[Runner] 测试执行失败: %s", e, exc_info=True)
-            self._stop_flag = True
+            self._stop_event.set()
             if self._on_fail:
                 self._on_fail(str(e))
             return False
 
         finally:
-            self._stop_flag = True
+            self._stop_event.set()
+            if self._printer_greenlet:
+                self._printer_greenlet.kill(block=False)
+                self._printer_greenlet = None
             if self._stats_greenlet:
-                self._stats_greenlet.kill()
+                self._stats_greenlet.join(timeout=5)
+            if self._request_flush_greenlet:
+                self._request_flush_greenlet.join(timeout=5)
 
     def print_summary(self):
         """打印测试摘要"""
@@ -359,8 +579,9 @@ class PerfXRunner:
         print(f"  平均响应时间: {total.avg_response_time:.2f}ms")
         print(f"  最小响应时间: {total.min_response_time or 0:.2f}ms")
         print(f"  最大响应时间: {total.max_response_time or 0:.2f}ms")
+        p95, p99 = self._resolve_percentiles(total)
         print(f"  中位数响应时间: {total.median_response_time or 0:.2f}ms")
-        print(f"  P95 响应时间: {total.get_response_time_percentile(0.95) or 0:.2f}ms")
-        print(f"  P99 响应时间: {total.get_response_time_percentile(0.99) or 0:.2f}ms")
+        print(f"  P95 响应时间: {p95:.2f}ms")
+        print(f"  P99 响应时间: {p99:.2f}ms")
         print(f"  RPS: {total.current_rps:.2f}")
         print("=" * 60 + "\n")
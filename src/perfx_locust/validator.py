@@ -2,7 +2,8 @@
 Argument Validator for perfx-locust
 """
 import logging
-from typing import Any, Dict, List
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Tuple
 
 from .models import (
     ArgumentParameter,
@@ -14,6 +15,40 @@ from .models import (
 logger = logging.getLogger(__name__)
 
 
+def _to_str(value: Any) -> Optional[str]:
+    return str(value)
+
+
+def _to_int_str(value: Any) -> Optional[str]:
+    if not isinstance(value, int):
+        try:
+            int(value)
+        except (ValueError, TypeError):
+            return None
+    return str(value)
+
+
+def _to_float_str(value: Any) -> Optional[str]:
+    if not isinstance(value, (int, float)):
+        try:
+            float(value)
+        except (ValueError, TypeError):
+            return None
+    return str(value)
+
+
+def _to_bool_str(value: Any) -> Optional[str]:
+    # 接受 true/false/1/0
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    lowered = str(value).lower()
+    if lowered in ("true", "1", "yes"):
+        return "true"
+    if lowered in ("false", "0", "no"):
+        return "false"
+    return None
+
+
 class ArgumentValidator:
     """
     参数验证器
@@ -21,6 +56,18 @@ class ArgumentValidator:
     根据 Endpoint 的 argument_schema 验证命令行传入的参数。
     """
 
+    # 连字符转下划线的翻译表，构建一次供 str.translate 使用
+    _HYPHEN_TABLE = str.maketrans("-", "_")
+
+    # 参数类型 -> 转换函数；未知类型按字符串处理
+    _CONVERTERS = {
+        "string": _to_str,
+        "choice": _to_str,
+        "int": _to_int_str,
+        "float": _to_float_str,
+        "bool": _to_bool_str,
+    }
+
     def __init__(self, test_run: TestRunDetail):
         """
         初始化验证器
@@ -30,32 +77,36 @@ class ArgumentValidator:
         """
         self.test_run = test_run
         self.parameters = test_run.get_argument_parameters()
+        # 参数元数据只读取一次：名称/下划线格式/必填/默认值/类型/
+        # 可选值（frozenset 成员判断）/转换函数，validate 循环直接解包
+        self._param_specs = [
+            (
+                p.name,
+                self._normalize_key(p.name),
+                p.required,
+                p.default,
+                p.type,
+                list(p.choices) if p.choices else None,
+                frozenset(p.choices) if p.choices else None,
+                self._CONVERTERS.get(p.type, _to_str),
+            )
+            for p in self.parameters
+        ]
+        # 帮助文本逐参数预格式化，format_help 只剩一次 join
+        self._help_lines = tuple(
+            "  --{:<20} {} {}{}{}".format(
+                p.name,
+                "[必填]" if p.required else "[可选]",
+                p.description or "",
+                f" (默认: {p.default})" if p.default else "",
+                f" 可选值: {p.choices}" if p.choices else "",
+            )
+            for p in self.parameters
+        )
 
     def _normalize_key(self, key: str) -> str:
         """将参数名标准化（连字符转下划线）"""
-        return key.replace("-", "_")
-
-    def _get_param_value(self, provided_args: Dict[str, Any], param_name: str) -> Any:
-        """
-        从提供的参数中获取值，支持连字符和下划线两种格式
-
-        Args:
-            provided_args: 用户提供的参数字典
-            param_name: 参数名（可能带连字符）
-
-        Returns:
-            参数值，如果不存在返回 None
-        """
-        # 先尝试原始名称
-        if param_name in provided_args:
-            return provided_args[param_name]
-
-        # 尝试下划线格式
-        underscore_name = self._normalize_key(param_name)
-        if underscore_name in provided_args:
-            return provided_args[underscore_name]
-
-        return None
+        return key.translate(self._HYPHEN_TABLE)
 
     def validate(self, provided_args: Dict[str, Any]) -> ValidationResult:
         """
@@ -70,50 +121,57 @@ class ArgumentValidator:
         errors: List[ValidationError] = []
         resolved: Dict[str, str] = {}
 
-        for param in self.parameters:
-            value = self._get_param_value(provided_args, param.name)
+        # 一次性构建下划线格式视图，支持连字符和下划线两种传参
+        normalized_args = {
+            self._normalize_key(k): v for k, v in provided_args.items()
+        }
+
+        for (name, norm_name, required, default, param_type,
+                choices, choice_set, convert) in self._param_specs:
+            value = provided_args.get(name, normalized_args.get(norm_name))
 
             # 检查必填参数
-            if param.required and value is None:
-                if param.default is not None:
+            if required and value is None:
+                if default is not None:
                     # 使用默认值
-                    resolved[param.name] = param.default
-                    logger.debug(
-                        "[Validator] 参数 %s 使用默认值: %s",
-                        param.name, param.default
-                    )
+                    resolved[name] = default
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(
+                            "[Validator] 参数 %s 使用默认值: %s",
+                            name, default
+                        )
                 else:
                     errors.append(ValidationError(
-                        parameter=param.name,
-                        message=f"参数 '{param.name}' 是必填的"
+                        parameter=name,
+                        message=f"参数 '{name}' 是必填的"
                     ))
                 continue
 
             if value is None:
                 # 非必填参数，使用默认值或跳过
-                if param.default is not None:
-                    resolved[param.name] = param.default
+                if default is not None:
+                    resolved[name] = default
                 continue
 
             # 类型验证
-            validated_value = self._validate_type(param, value)
+            validated_value = convert(value)
             if validated_value is None:
                 errors.append(ValidationError(
-                    parameter=param.name,
-                    message=f"参数 '{param.name}' 类型错误，期望 {param.type}"
+                    parameter=name,
+                    message=f"参数 '{name}' 类型错误，期望 {param_type}"
                 ))
                 continue
 
             # 选项验证
-            if param.type == "choice" and param.choices:
-                if validated_value not in param.choices:
+            if choice_set is not None and param_type == "choice":
+                if validated_value not in choice_set:
                     errors.append(ValidationError(
-                        parameter=param.name,
-                        message=f"参数 '{param.name}' 的值必须是以下之一: {param.choices}"
+                        parameter=name,
+                        message=f"参数 '{name}' 的值必须是以下之一: {choices}"
                     ))
                     continue
 
-            resolved[param.name] = validated_value
+            resolved[name] = validated_value
 
         return ValidationResult(
             valid=len(errors) == 0,
@@ -132,53 +190,27 @@ class ArgumentValidator:
         Returns:
             转换后的字符串值，如果类型错误返回 None
         """
-        try:
-            if param.type == "string" or param.type == "choice":
-                return str(value)
-            elif param.type == "int":
-                # 验证是整数
-                int(value)
-                return str(value)
-            elif param.type == "float":
-                # 验证是浮点数
-                float(value)
-                return str(value)
-            elif param.type == "bool":
-                # 接受 true/false/1/0
-                if isinstance(value, bool):
-                    return str(value).lower()
-                if str(value).lower() in ("true", "1", "yes"):
-                    return "true"
-                if str(value).lower() in ("false", "0", "no"):
-                    return "false"
-                return None
-            else:
-                return str(value)
-        except (ValueError, TypeError):
-            return None
+        return self._CONVERTERS.get(param.type, _to_str)(value)
+
+    @cached_property
+    def _required_parameter_names(self) -> Tuple[str, ...]:
+        return tuple(p.name for p in self.parameters if p.required)
 
-    def get_required_parameter_names(self) -> List[str]:
-        """获取必填参数名列表"""
-        return [p.name for p in self.parameters if p.required]
+    @cached_property
+    def _all_parameter_names(self) -> Tuple[str, ...]:
+        return tuple(p.name for p in self.parameters)
 
-    def get_all_parameter_names(self) -> List[str]:
-        """获取所有参数名列表"""
-        return [p.name for p in self.parameters]
+    def get_required_parameter_names(self) -> Tuple[str, ...]:
+        """获取必填参数名（元组，首次调用后缓存）"""
+        return self._required_parameter_names
+
+    def get_all_parameter_names(self) -> Tuple[str, ...]:
+        """获取所有参数名（元组，首次调用后缓存）"""
+        return self._all_parameter_names
 
     def format_help(self) -> str:
         """格式化参数帮助信息"""
-        if not self.parameters:
+        if not self._help_lines:
             return "此接口没有定义额外参数"
 
-        lines = ["接口参数说明:", ""]
-        for param in self.parameters:
-            required_str = "[必填]" if param.required else "[可选]"
-            default_str = f" (默认: {param.default})" if param.default else ""
-            choices_str = f" 可选值: {param.choices}" if param.choices else ""
-            desc = param.description or ""
-            
-            lines.append(
-                f"  --{param.name:<20} {required_str} {desc}{default_str}{choices_str}"
-            )
-
-        return "\n".join(lines)
+        return "\n".join(("接口参数说明:", "", *self._help_lines))